@@ -95,7 +95,7 @@ def log_error_to_web(error_message):
 def ping_api():
     print(f"Pinging API: {API_MOTION_ENDPOINT}")
     try:
-        response = urequests.get(API_MOTION_ENDPOINT, timeout=5) 
+        response = urequests.post(API_MOTION_ENDPOINT, json={"device": "ESP32", "event": "hello"}, timeout=5)
         if response.status_code == 200:
             print("API Ping Success: Server is ready.")
             response.close()
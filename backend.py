@@ -1,9 +1,12 @@
 import logging
-from logging.handlers import RotatingFileHandler
-from flask import Flask, request, jsonify
+from logging.handlers import RotatingFileHandler, QueueHandler, QueueListener
+import queue
+import atexit
+from flask import Flask, Response, request
+import orjson  # pip install orjson
 from pygame import mixer
-import threading
-import time
+from waitress import serve  # pip install waitress
+from concurrent.futures import ThreadPoolExecutor
 import os
 import socket
 
@@ -11,12 +14,24 @@ import socket
 # We will log everything to a file named 'esp32_events.log'
 LOG_FILE = 'esp32_events.log'
 
+class FastRotatingFileHandler(RotatingFileHandler):
+    """RotatingFileHandler without the per-record exists()/isfile() checks."""
+
+    def shouldRollover(self, record):
+        if self.stream is None:
+            self.stream = self._open()
+        if self.maxBytes > 0:
+            msg = "%s\n" % self.format(record)
+            self.stream.seek(0, 2)  # non-posix-compliant Windows feature
+            return self.stream.tell() + len(msg) >= self.maxBytes
+        return False
+
 # Get the root logger
 logger = logging.getLogger()
 logger.setLevel(logging.INFO) # Set the minimum level to log
 
 # Create file handler (Rotates log file when it reaches 1MB)
-file_handler = RotatingFileHandler(LOG_FILE, maxBytes=1024 * 1024, backupCount=5)
+file_handler = FastRotatingFileHandler(LOG_FILE, maxBytes=1024 * 1024, backupCount=5)
 file_handler.setLevel(logging.INFO)
 
 # Create console handler
@@ -28,12 +43,19 @@ formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
 file_handler.setFormatter(formatter)
 console_handler.setFormatter(formatter)
 
-# Add the handlers to the root logger
+# Route records through a queue so request threads only enqueue them;
+# a background listener does the formatting and file/console writes.
+log_queue = queue.SimpleQueue()
+queue_handler = QueueHandler(log_queue)
+log_listener = QueueListener(log_queue, file_handler, console_handler, respect_handler_level=True)
+log_listener.start()
+atexit.register(log_listener.stop)  # flush pending records on shutdown
+
+# Add the queue handler to the root logger
 # (Remove previous handlers if any, to avoid duplicate logs in console)
 if logger.hasHandlers():
     logger.handlers.clear()
-logger.addHandler(file_handler)
-logger.addHandler(console_handler)
+logger.addHandler(queue_handler)
 # --- End of Logging Setup ---
 
 app = Flask(__name__)
@@ -47,55 +69,94 @@ FULL_MP3_PATH = os.path.join(SCRIPT_DIR, MP3_FILE_PATH)
 try:
     mixer.init(frequency=44100)
 except Exception as e:
-    logger.error(f"ERROR: Could not initialize pygame mixer. Check audio device. {e}")
+    logger.error("ERROR: Could not initialize pygame mixer. Check audio device. %s", e)
+
+# Decode the MP3 once up front instead of on every motion event
+try:
+    PRELOADED_SOUND = mixer.Sound(FULL_MP3_PATH)
+except Exception as e:
+    PRELOADED_SOUND = None
+    logger.error("ERROR: Could not load MP3 %s. %s", FULL_MP3_PATH, e)
+
+# Single worker so play() calls are serialized and threads are not spawned per request
+AUDIO_EXEC = ThreadPoolExecutor(max_workers=1)
+
+# --- JSON helpers ---
+def parse_json_body():
+    """Parse the raw request body with orjson (empty body -> {})."""
+    body = request.get_data()
+    return orjson.loads(body) if body else {}
+
+def json_response(payload, status=200):
+    """Build a JSON response encoded with orjson (payload may be pre-encoded bytes)."""
+    body = payload if isinstance(payload, bytes) else orjson.dumps(payload)
+    return Response(body, status=status, mimetype='application/json')
+
+# Fixed response bodies, encoded once at import.
+# A fresh Response is still built per request so headers are never shared.
+R_READY = orjson.dumps({"status": "server_is_ready"})
+R_OK = orjson.dumps({"status": "success", "action": "alert_played"})
+R_BUSY = orjson.dumps({"status": "success", "action": "alert_skipped_busy"})
+R_LOGGED = orjson.dumps({"status": "error_logged"})
+R_INVALID_JSON = orjson.dumps({"message": "Invalid JSON"})
 
 # --- Thread for playing sound ---
 def play_audio_thread():
     try:
-        logger.info(f"Server: Attempting to play MP3: {FULL_MP3_PATH}")
-        sound = mixer.Sound(FULL_MP3_PATH)
-        sound.play() 
-        time.sleep(sound.get_length())
+        if PRELOADED_SOUND is None:
+            raise RuntimeError("MP3 was not loaded at startup")
+        logger.info("Server: Attempting to play MP3: %s", FULL_MP3_PATH)
+        PRELOADED_SOUND.play()
     except Exception as e:
-        logger.error(f"Server ERROR: Could not play audio. {e}")
+        logger.error("Server ERROR: Could not play audio. %s", e)
 
-# --- API Endpoint 1: Ping (for STATE_INIT) ---
-@app.route('/api/motion_event', methods=['GET'])
-def ping_server():
-    """Handles the 'ping' from the ESP32 to check if the server is alive."""
-    # This will now log to both console and file
-    logger.info("Server: Received GET (Ping) request. Responding with OK.")
-    return jsonify({"status": "server_is_ready"}), 200
-
-# --- API Endpoint 2: Trigger (for STATE_ACTIVE) ---
+# --- API Endpoint 1: Trigger (hello ping in STATE_INIT, motion in STATE_ACTIVE) ---
 @app.route('/api/motion_event', methods=['POST'])
 def handle_motion_event():
-    """Handles the POST request from the ESP32 to play the sound."""
+    """Handles the POST request from the ESP32 to play the sound (or answer its hello ping)."""
     try:
-        data = request.get_json()
-        # This will now log to both console and file
-        logger.info(f"Server: Received MOTION POST request. Data: {data}")
+        data = parse_json_body()
     except Exception as e:
-        logger.error(f"Server ERROR: Failed to parse MOTION JSON body. {e}")
-        return jsonify({"message": "Invalid JSON"}), 400
+        logger.error("Server ERROR: Failed to parse MOTION JSON body. %s", e)
+        return json_response(R_INVALID_JSON, 400)
+
+    # The ESP32 sends a "hello" event as its readiness probe; don't play audio for it.
+    # Logged at DEBUG so the boot-time pings (sent only in STATE_INIT) stay out of the INFO log.
+    if isinstance(data, dict) and data.get("event") == "hello":
+        logger.debug("Server: Received hello ping. Data: %s", data)
+        return json_response(R_READY)
+
+    # This will now log to both console and file
+    logger.info("Server: Received MOTION POST request. Data: %s", data)
+
+    # Drop overlapping triggers (and tell the ESP32) instead of queueing them behind the clip
+    # (PRELOADED_SOUND is None when the mixer failed to start; get_busy() would raise)
+    if PRELOADED_SOUND is not None and mixer.get_busy():
+        logger.info("Server: Audio already playing, ignoring trigger.")
+        return json_response(R_BUSY)
 
-    audio_thread = threading.Thread(target=play_audio_thread)
-    audio_thread.start()
+    AUDIO_EXEC.submit(play_audio_thread)
     
-    return jsonify({"status": "success", "action": "alert_played"}), 200
+    return json_response(R_OK)
 
-# --- API Endpoint 3: Error Logging ---
+# --- API Endpoint 2: Error Logging ---
 @app.route('/api/log_error', methods=['POST'])
 def handle_error_log():
-    """Receives error logs from the ESP32 and logs them."""
+    """Receives error logs (single or batched) from the ESP32 and logs them."""
     try:
-        error_data = request.get_json()
+        error_data = parse_json_body()
+        device = error_data.get('device', 'Unknown')
+        # Newer firmware batches several errors into one POST as an "errors" list
+        errors = error_data.get('errors')
+        if not isinstance(errors, list):
+            errors = [error_data.get('error', 'No message')]
         # This will log as a "WARNING" to stand out in the log file
-        logger.warning(f"!! ERROR LOG RECEIVED from {error_data.get('device', 'Unknown')} !! Error: {error_data.get('error', 'No message')}")
+        for error in errors:
+            logger.warning("!! ERROR LOG RECEIVED from %s !! Error: %s", device, error)
     except Exception as e:
-        logger.error(f"Server ERROR: Failed to parse log_error JSON. {e}")
+        logger.error("Server ERROR: Failed to parse log_error JSON. %s", e)
     
-    return jsonify({"status": "error_logged"}), 200
+    return json_response(R_LOGGED)
 
 if __name__ == '__main__':
     try:
@@ -108,12 +169,15 @@ if __name__ == '__main__':
 
     # Use the logger instead of print
     logger.info("=" * 50)
-    logger.info("FLASK SERVER IS READY (with File Logging)")
+    logger.info("FLASK SERVER IS READY (waitress, with File Logging)")
     logger.info("-" * 50)
-    logger.info(f"  Your PC's Local IP Address is: {local_ip}")
-    logger.info(f"  Motion Endpoint: http://{local_ip}:5000/api/motion_event")
-    logger.info(f"  Error Log Endpoint: http://{local_ip}:5000/api/log_error")
-    logger.info(f"  Logs are being saved to: {LOG_FILE}")
+    logger.info("  Your PC's Local IP Address is: %s", local_ip)
+    logger.info("  Motion Endpoint: http://%s:5000/api/motion_event", local_ip)
+    logger.info("  Error Log Endpoint: http://%s:5000/api/log_error", local_ip)
+    logger.info("  Logs are being saved to: %s", LOG_FILE)
     logger.info("=" * 50)
     
-    app.run(host='192.168.5.212', port=5000)
\ No newline at end of file
+    # Production WSGI server with a worker thread pool instead of Flask's dev server.
+    # channel_timeout stays well above the ESP32's keep-alive idle limit (60 s) so
+    # the board, not the server, decides when a kept socket is retired.
+    serve(app, host='192.168.5.212', port=5000, threads=8, connection_limit=64, channel_timeout=120)
\ No newline at end of file
@@ -11,6 +11,9 @@ from serial.tools import list_ports
 CONFIG_FILE = "esp_config.json"
 DEFAULT_BAUD = 115200
 
+# Set once the board has been nudged; cleared when an mpremote call fails
+_NUDGED = False
+
 
 def nudge_board(port, baud=DEFAULT_BAUD):
     """Try to stop any running script and leave the board ready for REPL."""
@@ -32,16 +35,35 @@ def nudge_board(port, baud=DEFAULT_BAUD):
         print(f"Nudge failed ({e}), continuing...")
 
 
-def run(cmd):
-    """Run a subprocess command and return result."""
+def ensure_nudged(port, baud=DEFAULT_BAUD):
+    """Nudge the board only if it has not already been nudged this session."""
+    global _NUDGED
+    if not _NUDGED:
+        nudge_board(port, baud)
+        _NUDGED = True
+
+
+def run(cmd, capture=True):
+    """Run a subprocess command and return result.
+
+    With capture=False the output goes straight to the terminal and the
+    result's stdout/stderr are None.
+    """
+    global _NUDGED
     print("→", " ".join(cmd))
-    return subprocess.run(cmd, capture_output=True, text=True)
+    if capture:
+        res = subprocess.run(cmd, capture_output=True, text=True)
+    else:
+        res = subprocess.run(cmd)
+    if res.returncode != 0:
+        _NUDGED = False  # board state unknown, nudge again next time
+    return res
 
 
 def stream_run(port, file_name):
     """Run a script on ESP32 and stream its output live to the terminal."""
     print(f"▶Running {file_name} on {port} (press Ctrl+C to stop)\n")
-    nudge_board(port)
+    ensure_nudged(port)
 
     try:
         # Open a persistent mpremote run session
@@ -63,32 +85,46 @@ def load_config():
 
 
 def upload_files(port, files):
-    """Upload all files listed in config."""
+    """Upload all files listed in config in a single mpremote session."""
+    existing = []
     for f in files:
-        if not Path(f).exists():
-            print(f"File not found: {f}")
-            continue
-        for attempt in range(1, 4):
-            res = run(["mpremote", "connect", port, "cp", f, ":"])
-            if res.returncode == 0:
-                if res.stdout.strip():
-                    print(res.stdout.strip())
-                break
-            print(f"cp failed for {f} (try {attempt}/3)")
-            if res.stdout:
-                print(res.stdout)
-            if res.stderr:
-                print(res.stderr)
-            nudge_board(port)
-            time.sleep(0.4)
+        if Path(f).exists():
+            existing.append(f)
         else:
-            sys.exit(1)
+            print(f"File not found: {f}")
+    if not existing:
+        return
+
+    for attempt in range(1, 4):
+        res = run(["mpremote", "connect", port, "cp", *existing, ":"], capture=False)
+        if res.returncode == 0:
+            break
+        print(f"cp failed (try {attempt}/3)")
+        nudge_board(port)
+        time.sleep(0.4)
+    else:
+        sys.exit(1)
+
+
+def bulk_run(port, commands):
+    """Chain several mpremote commands with '+' so they share one serial session."""
+    cmd = ["mpremote", "connect", port]
+    for i, c in enumerate(commands):
+        if i:
+            cmd.append("+")
+        cmd.extend(c)
+    print("→", " ".join(cmd))
+    try:
+        return subprocess.call(cmd)
+    except KeyboardInterrupt:
+        print("\nStopped by user.")
+        return 0
 
 
 def pull_file(port, remote):
     """Pull a remote file to local directory."""
     local = Path(remote).name
-    nudge_board(port)
+    ensure_nudged(port)
     res = run(["mpremote", "connect", port, "cp", f":{remote}", local])
     if res.returncode != 0:
         print("pull failed")
@@ -104,23 +140,17 @@ def pull_file(port, remote):
 
 def delete_file(port, remote):
     """Delete a remote file on the ESP32."""
-    nudge_board(port)
-    res = run(["mpremote", "connect", port, "rm", remote])
+    ensure_nudged(port)
+    res = run(["mpremote", "connect", port, "rm", remote], capture=False)
     if res.returncode != 0:
         print("delete failed")
-        if res.stdout:
-            print(res.stdout)
-        if res.stderr:
-            print(res.stderr)
         sys.exit(1)
-    if res.stdout.strip():
-        print(res.stdout.strip())
     print(f"Deleted {remote}")
 
 
 def list_files(port, folder=None):
     """List files/folders on the ESP32."""
-    nudge_board(port)
+    ensure_nudged(port)
     args = ["mpremote", "connect", port, "ls"]
     if folder:
         args.append(folder)
@@ -135,13 +165,239 @@ def list_files(port, folder=None):
     print(res.stdout or "(empty)")
 
 
+class RawReplError(Exception):
+    """Raised when the board does not answer as expected in raw REPL mode."""
+
+
+class EspSession:
+    """
+    One serial connection to the board, reused for every operation.
+
+    Speaks MicroPython's raw REPL directly so the port is opened (and the
+    board nudged) once per CLI invocation instead of once per mpremote call.
+
+    Usage:
+        with EspSession(port) as esp:
+            esp.cp("main.py")
+            print(esp.ls())
+    """
+    CHUNK = 256
+
+    def __init__(self, port, baud=DEFAULT_BAUD):
+        self.port = port
+        self.baud = baud
+        self.ser = None
+        self._rx = bytearray()  # bytes read from the port but not consumed yet
+
+    def __enter__(self):
+        if self.ser is None:
+            self.open()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def open(self):
+        ensure_nudged(self.port, self.baud)
+        self.ser = serial.Serial(self.port, baudrate=self.baud, timeout=1)
+        try:
+            self.reset()
+        except Exception:
+            self.close()
+            raise
+
+    def reset(self):
+        """Interrupt whatever the board is doing and (re-)enter the raw REPL."""
+        self.ser.write(b'\r\x03\x03')  # Ctrl-C twice: stop any running script
+        time.sleep(0.1)
+        self.ser.reset_input_buffer()
+        self._rx.clear()
+        self.ser.write(b'\r\x01')  # Ctrl-A: enter raw REPL
+        self._read_until(b'raw REPL; CTRL-B to exit\r\n>')
+
+    def close(self):
+        if self.ser is None:
+            return
+        try:
+            self.ser.write(b'\r\x02')  # Ctrl-B: back to the friendly REPL
+        except Exception:
+            pass
+        try:
+            self.ser.close()
+        except Exception:
+            pass
+        self.ser = None
+
+    def _fill(self):
+        """Move everything the port has buffered (or one byte, waiting up to 1s) into _rx."""
+        chunk = self.ser.read(self.ser.in_waiting or 1)
+        self._rx += chunk
+        return chunk
+
+    def _read_exact(self, n, timeout=1):
+        deadline = time.monotonic() + timeout
+        while len(self._rx) < n:
+            if not self._fill() and time.monotonic() > deadline:
+                break
+        out = bytes(self._rx[:n])
+        del self._rx[:n]
+        return out
+
+    def _read_until(self, ending, timeout=10, stream=None):
+        """Return the bytes before `ending` and consume them; anything after stays in _rx.
+
+        With `stream` (a binary file), output is written through as it arrives.
+        """
+        data = self._rx
+        deadline = None if timeout is None else time.monotonic() + timeout
+        start = streamed = 0
+        while True:
+            idx = data.find(ending, start)
+            if idx != -1:
+                break
+            # The tail could be the start of `ending`, so hold it back
+            start = max(0, len(data) - len(ending) + 1)
+            if stream and start > streamed:
+                stream.write(data[streamed:start])
+                stream.flush()
+                streamed = start
+            if self._fill():
+                if deadline is not None:
+                    deadline = time.monotonic() + timeout
+            elif deadline is not None and time.monotonic() > deadline:
+                raise RawReplError(f"timeout waiting for {ending!r}")
+        if stream and idx > streamed:
+            stream.write(data[streamed:idx])
+            stream.flush()
+        out = bytes(data[:idx])
+        del data[:idx + len(ending)]
+        return out
+
+    def exec(self, code, timeout=10, stream=None):
+        """Execute code on the board and return its stdout as bytes."""
+        if isinstance(code, str):
+            code = code.encode()
+        for i in range(0, len(code), self.CHUNK):
+            self.ser.write(code[i:i + self.CHUNK])
+            time.sleep(0.01)
+        self.ser.write(b'\x04')
+        if self._read_exact(2) != b'OK':
+            raise RawReplError("board did not accept code")
+        out = self._read_until(b'\x04', timeout, stream)
+        err = self._read_until(b'\x04', timeout)
+        self._read_until(b'>', timeout)
+        if err:
+            raise RawReplError(err.decode(errors="replace").strip())
+        return out
+
+    def cp(self, local, remote=None):
+        """Copy a local file to the board."""
+        remote = remote or Path(local).name
+        data = Path(local).read_bytes()
+        self.exec(f"f=open({remote!r},'wb')\nw=f.write")
+        try:
+            for i in range(0, len(data), self.CHUNK):
+                self.exec(f"w({data[i:i + self.CHUNK]!r})")
+        except RawReplError:
+            # Don't leave the half-written file open on the board
+            try:
+                self.reset()
+                self.exec("f.close()")
+            except Exception:
+                pass
+            raise
+        self.exec("f.close()")
+
+    def get(self, remote, local):
+        """Copy a file from the board to a local path."""
+        out = self.exec(
+            "import ubinascii\n"
+            f"with open({remote!r},'rb') as f:\n"
+            " while 1:\n"
+            f"  b=f.read({self.CHUNK})\n"
+            "  if not b: break\n"
+            "  print(ubinascii.hexlify(b).decode())\n"
+        )
+        Path(local).write_bytes(b"".join(bytes.fromhex(line) for line in out.decode().split()))
+
+    def rm(self, remote):
+        """Delete a file on the board."""
+        self.exec(f"import os\nos.remove({remote!r})")
+
+    def ls(self, folder=""):
+        """Return a directory listing as text (folders end with '/')."""
+        out = self.exec(
+            "import os\n"
+            f"for e in os.ilistdir({(folder or '/')!r}):\n"
+            " print(e[0] + ('/' if e[1] & 0x4000 else ''))\n"
+        )
+        return out.decode().replace("\r\n", "\n")
+
+    def run(self, file_name):
+        """Run a local script on the board and stream its output live."""
+        print(f"▶Running {file_name} on {self.port} (press Ctrl+C to stop)\n")
+        sys.stdout.flush()
+        try:
+            # Raw bytes, so multi-byte UTF-8 split across reads is not garbled
+            self.exec(Path(file_name).read_bytes(), timeout=None, stream=sys.stdout.buffer)
+        except KeyboardInterrupt:
+            self.ser.write(b'\x03')
+            print("\nStopped by user.")
+
+
+def session_main(esp, args, files, entry):
+    """Run the requested CLI action(s) over an open EspSession.
+
+    serial.SerialException is left to the caller so it can fall back to mpremote.
+    """
+    try:
+        if args.run:
+            esp.run(args.run)
+            return
+        if args.pull:
+            local = Path(args.pull).name
+            esp.get(args.pull, local)
+            print(f"Pulled {args.pull} -> {local}")
+            return
+        if args.delete:
+            esp.rm(args.delete)
+            print(f"Deleted {args.delete}")
+            return
+        if args.ls is not None:
+            print(esp.ls(args.ls) or "(empty)")
+            return
+
+        for f in files:
+            if not Path(f).exists():
+                print(f"File not found: {f}")
+                continue
+            for attempt in range(1, 4):
+                print("→ cp", f, ":")
+                try:
+                    esp.cp(f)
+                    break
+                except RawReplError as e:
+                    print(f"cp failed for {f} (try {attempt}/3): {e}")
+                    time.sleep(0.4)
+                    esp.reset()
+            else:
+                sys.exit(1)
+        if args.autorun:
+            esp.run(entry)
+    except RawReplError as e:
+        print(f"Board error: {e}")
+        sys.exit(1)
+
+
 def main():
+    global _NUDGED
     parser = argparse.ArgumentParser(description="ESP32 file manager using mpremote")
     parser.add_argument("--autorun", action="store_true", help="Run entry point after upload (from config)")
     parser.add_argument("--run", metavar="REMOTE_FILE", help="Run a specific file and stream its output")
     parser.add_argument("--pull", metavar="REMOTE_FILE", help="Pull a file from ESP32 to local")
     parser.add_argument("--delete", metavar="REMOTE_FILE", help="Delete a file on ESP32")
     parser.add_argument("--ls", nargs="?", const="", metavar="REMOTE_DIR", help="List files on ESP32 (root or folder)")
+    parser.add_argument("--bulk", action="store_true", help="Chain all actions into one mpremote session")
     args = parser.parse_args()
 
     cfg = load_config()
@@ -149,6 +405,50 @@ def main():
     files = cfg.get("files", [])
     entry = cfg.get("entry_point", "main.py")
 
+    # Bulk mode: chain every requested action into a single mpremote invocation
+    if args.bulk:
+        commands = []
+        if args.pull:
+            commands.append(["cp", f":{args.pull}", Path(args.pull).name])
+        if args.delete:
+            commands.append(["rm", args.delete])
+        if args.ls is not None:
+            commands.append(["ls"] + ([args.ls] if args.ls else []))
+        if not commands:
+            existing = [f for f in files if Path(f).exists()]
+            if existing:
+                commands.append(["cp", *existing, ":"])
+            if args.autorun:
+                commands.append(["run", entry])
+        if args.run:
+            commands.append(["run", args.run])
+        if not commands:
+            print("Nothing to do.")
+            return
+        ensure_nudged(port)
+        sys.exit(bulk_run(port, commands))
+
+    # Preferred path: one serial session shared by every action
+    session = EspSession(port)
+    try:
+        session.open()
+    except (serial.SerialException, RawReplError) as e:
+        print(f"Raw REPL session failed ({e}), falling back to mpremote...")
+        session = None
+    if session is not None:
+        if args.ls is None and not (args.run or args.pull or args.delete):
+            print(f"📦 Using port: {port}")
+            print(f"📁 Files to upload: {', '.join(files) if files else '(none)'}")
+            print(f"🚀 Entry point: {entry}")
+            print(f"⚙️ Run after upload: {'Yes' if args.autorun else 'No'}\n")
+        try:
+            with session:
+                session_main(session, args, files, entry)
+            return
+        except serial.SerialException as e:
+            print(f"Serial session lost ({e}), falling back to mpremote...")
+            _NUDGED = False  # board state unknown, nudge again before mpremote
+
     # Special single actions first
     if args.run:
         stream_run(port, args.run)
@@ -169,7 +469,7 @@ def main():
     print(f"🚀 Entry point: {entry}")
     print(f"⚙️ Run after upload: {'Yes' if args.autorun else 'No'}\n")
 
-    nudge_board(port)
+    ensure_nudged(port)
     upload_files(port, files)
 
     if args.autorun:
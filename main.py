@@ -1,23 +1,34 @@
 # type: ignore
 
 import time
+import micropython
 import network
-import urequests
-from machine import Pin, Timer
-import urandom as random  # use MicroPython's urandom
+import usocket as socket
+import ujson as json
+from machine import Pin, Timer, PWM
+from urandom import getrandbits  # use MicroPython's urandom
 
 
 # --- Configuration ---
 WIFI_SSID = "ATT4NET_TMP"
 WIFI_PASS = "12345678@1"
 # Use your PC's IP
-BASE_IP = "http://192.168.5.212:5000" 
-API_MOTION_ENDPOINT = BASE_IP + "/api/motion_event"
-API_LOG_ENDPOINT = BASE_IP + "/api/log_error"  # NEW: Error logging endpoint
+SERVER_HOST = "192.168.5.212"
+SERVER_PORT = 5000
+BASE_IP = "http://%s:%d" % (SERVER_HOST, SERVER_PORT)
+API_MOTION_PATH = "/api/motion_event"
+API_LOG_PATH = "/api/log_error"  # NEW: Error logging endpoint
+API_MOTION_ENDPOINT = BASE_IP + API_MOTION_PATH
+API_LOG_ENDPOINT = BASE_IP + API_LOG_PATH
+
+# Fixed request bodies, encoded once so no json.dumps runs on the hot path
+HELLO_BODY = b'{"device":"ESP32","event":"hello"}'
+MOTION_BODY = b'{"device":"ESP32","event":"motion_detected"}'
 
 MOTION_PIN = 21     # D21 -> GPIO 21
 LED_PIN = 5         # D5  -> GPIO 5
 LED_FLASH_TIME_MS = 21 * 1000  # Flash LED for 8 seconds
+FLICKER_PERIOD_MS = 80         # How often blink_led updates the PWM brightness
 TOTAL_COOLDOWN_MS = 23 * 1000 # Total cooldown is 10 seconds
 
 # --- State Definitions ---
@@ -29,24 +40,168 @@ STATE_ACTIVE = 2
 current_state = STATE_INIT
 led = Pin(LED_PIN, Pin.OUT)
 pir = Pin(MOTION_PIN, Pin.IN, Pin.PULL_DOWN)
+motion_event = False  # Set by the PIR interrupt, consumed in STATE_IDLE
 wlan = network.WLAN(network.STA_IF) # Define wlan globally
 
 cooldown_timer = Timer(0) 
 led_stop_timer = Timer(1) 
 led_flash_timer = Timer(2) 
+flicker_timer = Timer(3)  # drives blink_led
+# All four ESP32 hardware timers are used above; don't give wifi_connector a
+# blink_timer_id if it is ever combined with this file
+flicker_pwm = None  # PWM on the LED while blink_led is running, None otherwise
+flicker_start = 0
+flicker_speed_ms = 100
+flicker_total_ms = 0
+
+
+# --- HTTP Client (keep-alive) ---
+
+class HttpClient:
+    """Minimal HTTP/1.1 client that keeps one TCP connection open to the server."""
+
+    def __init__(self, host, port, timeout=5, max_idle_ms=60000):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        # Must stay below the server's idle timeout (waitress channel_timeout in
+        # backend.py) so a kept socket is dropped here before the server drops it
+        self.max_idle_ms = max_idle_ms
+        self.sock = None
+        self._addr = None
+        self._last_used = 0
+
+    def _connect(self):
+        if self._addr is None:
+            self._addr = socket.getaddrinfo(self.host, self.port)[0][-1]
+        s = socket.socket()
+        s.settimeout(self.timeout)
+        try:
+            s.connect(self._addr)
+        except Exception:
+            s.close()
+            raise
+        self.sock = s
+
+    def close(self):
+        if self.sock:
+            try:
+                self.sock.close()
+            except Exception:
+                pass
+            self.sock = None
+
+    def post(self, path, body):
+        """POST a JSON body (bytes) and return the HTTP status code."""
+        if self.sock is not None and time.ticks_diff(time.ticks_ms(), self._last_used) > self.max_idle_ms:
+            self.close()
+        reused = self.sock is not None
+        status = self._send(path, body)
+        if status is None and reused:
+            # The kept-alive socket had gone stale before the server answered
+            # (write failed or closed with no response byte), so the request was
+            # not processed; resend once on a fresh connection. Anything else
+            # (e.g. a read timeout) is not retried, a motion POST must not repeat.
+            status = self._send(path, body)
+        if status is None:
+            raise OSError("connection closed by server")
+        return status
+
+    def _send(self, path, body):
+        """One request attempt; closes the socket on any error or stale connection."""
+        if self.sock is None:
+            self._connect()
+        try:
+            status = self._request(path, body)
+        except Exception:
+            self.close()
+            raise
+        if status is None:
+            self.close()
+        else:
+            self._last_used = time.ticks_ms()
+        return status
+
+    def _request(self, path, body):
+        """Returns the status code, or None if the socket was dead before any response byte."""
+        s = self.sock
+        try:
+            s.write(("POST %s HTTP/1.1\r\nHost: %s\r\nContent-Type: application/json\r\n"
+                     "Content-Length: %d\r\nConnection: keep-alive\r\n\r\n"
+                     % (path, self.host, len(body))).encode())
+            s.write(body)
+        except OSError:
+            return None
+
+        line = s.readline()
+        if not line:
+            return None
+        status = int(line.split(None, 2)[1])
+        length = 0
+        keep_alive = True
+        while True:
+            header = s.readline()
+            if not header or header == b"\r\n":
+                break
+            name, _, value = header.decode().partition(":")
+            name = name.strip().lower()
+            if name == "content-length":
+                length = int(value)
+            elif name == "connection" and value.strip().lower() == "close":
+                keep_alive = False
+        # Drain the body so the socket is ready for the next request
+        while length > 0:
+            chunk = s.read(length)
+            if not chunk:
+                keep_alive = False
+                break
+            length -= len(chunk)
+        if not keep_alive:
+            self.close()
+        return status
+
+
+http = HttpClient(SERVER_HOST, SERVER_PORT)
 
 
 # --- Helper Functions ---
 
+def flicker_callback(t):
+    pwm = flicker_pwm
+    if pwm is None:
+        return
+    elapsed = time.ticks_diff(time.ticks_ms(), flicker_start)
+    if elapsed >= flicker_total_ms:
+        end_flicker()
+    elif (elapsed // flicker_speed_ms) % 2 == 0:
+        pwm.duty(getrandbits(10))  # inside a burst: random brightness 0-1023
+    else:
+        pwm.duty(0)  # dark gap between bursts so the blink count stays readable
+
+def end_flicker():
+    """Stops a blink_led flicker and hands the LED back to plain GPIO."""
+    global flicker_pwm
+    if flicker_pwm is None:
+        return
+    flicker_timer.deinit()
+    flicker_pwm.deinit()
+    flicker_pwm = None
+    led.init(Pin.OUT)
+    led.value(0)
+
 def blink_led(count=3, speed_ms=100):
-    """Spooky flicker for visual feedback."""
-    for _ in range(count):
-        for _ in range(random.randint(2, 6)):   # small random inner flickers
-            led.value(1)
-            time.sleep_ms(random.randint(30, 200))
-            led.value(0)
-            time.sleep_ms(random.randint(20, 150))
-        time.sleep_ms(random.randint(speed_ms, speed_ms * 2))
+    """Spooky flicker for visual feedback.
+
+    Shows `count` flickering bursts of speed_ms each, separated by dark gaps of
+    the same length. Runs on PWM + its own hardware timer and returns immediately.
+    """
+    global flicker_pwm, flicker_start, flicker_speed_ms, flicker_total_ms
+    end_flicker()
+    flicker_start = time.ticks_ms()
+    flicker_speed_ms = speed_ms
+    flicker_total_ms = count * speed_ms * 2
+    flicker_pwm = PWM(led, freq=1000, duty=0)
+    flicker_timer.init(period=FLICKER_PERIOD_MS, mode=Timer.PERIODIC, callback=flicker_callback)
 
 def connect_wifi():
     global wlan
@@ -117,41 +272,69 @@ def connect_wifi():
     return False
 
 # --- NEW: Error Logging Function ---
+# Errors are queued here and sent in one batched POST from the main loop while
+# idle, so a failing network never adds extra blocking POSTs to the motion/ping path.
+_err_ring = []
+_ERR_MAX = 8
+ERR_FLUSH_INTERVAL_MS = 1000
+ERR_FLUSH_MAX_DELAY_MS = 60 * 1000
+_err_flush_delay_ms = ERR_FLUSH_INTERVAL_MS  # doubled after each failed flush
+_last_err_flush = time.ticks_ms()
+
 def log_error_to_web(error_message):
-    """Sends a POST request to the error logging endpoint."""
-    global wlan
+    """Queues an error for the logging endpoint (drops the oldest when full)."""
+    if len(_err_ring) >= _ERR_MAX:
+        _err_ring.pop(0)
+    _err_ring.append(str(error_message))
+
+def flush_errors():
+    """Sends all queued errors in a single POST once the batch is full or 1s has passed.
+
+    While the server is unreachable the wait doubles after each failure (up to
+    ERR_FLUSH_MAX_DELAY_MS), so a dead server doesn't stall IDLE on every retry.
+    """
+    global wlan, _err_ring, _last_err_flush, _err_flush_delay_ms
+    if not _err_ring:
+        return
+    backing_off = _err_flush_delay_ms > ERR_FLUSH_INTERVAL_MS
+    if (len(_err_ring) < _ERR_MAX or backing_off) and time.ticks_diff(time.ticks_ms(), _last_err_flush) < _err_flush_delay_ms:
+        return
     if not wlan.isconnected():
-        print(f"Cannot log error, Wi-Fi is down. Error: {error_message}")
         return
 
-    print(f"Logging error to web: {error_message}")
+    batch = _err_ring
+    _err_ring = []
+    _last_err_flush = time.ticks_ms()
+    print(f"Logging {len(batch)} error(s) to web")
     try:
         data = {
             "device": "ESP32_Motion_Sensor",
-            "error": str(error_message)
+            "errors": batch
         }
-        response = urequests.post(API_LOG_ENDPOINT, json=data)
-        if response.status_code == 200:
+        status = http.post(API_LOG_PATH, json.dumps(data).encode())
+        _err_flush_delay_ms = ERR_FLUSH_INTERVAL_MS
+        if status == 200:
             print("Error log successful.")
         else:
-            print(f"Failed to log error, server returned HTTP {response.status_code}")
-        response.close()
+            print(f"Failed to log error, server returned HTTP {status}")
     except Exception as e:
         print(f"Exception while logging error: {e}")
+        # Put the batch back in front of anything queued meanwhile, keeping the newest
+        _err_ring = (batch + _err_ring)[-_ERR_MAX:]
+        _err_flush_delay_ms = min(_err_flush_delay_ms * 2, ERR_FLUSH_MAX_DELAY_MS)
 
 # --- UPDATED: API Ping Function ---
+# A single "hello" POST doubles as the readiness probe (no separate GET round-trip)
 def ping_api():
     print(f"Pinging API: {API_MOTION_ENDPOINT}")
     try:
-        response = urequests.get(API_MOTION_ENDPOINT, timeout=5) 
-        if response.status_code == 200:
+        status = http.post(API_MOTION_PATH, HELLO_BODY)
+        if status == 200:
             print("API Ping Success: Server is ready.")
-            response.close()
             return True
         else:
-            error_msg = f"API Ping Failed: Server returned HTTP {response.status_code}"
+            error_msg = f"API Ping Failed: Server returned HTTP {status}"
             print(error_msg)
-            response.close()
             # We can log this error because Wi-Fi is working
             log_error_to_web(error_msg) # MODIFIED: Log this error
             return False
@@ -165,15 +348,13 @@ def ping_api():
 def call_api_post():
     print(f"Calling API (POST) to play sound...")
     try:
-        data = {"device": "ESP32", "event": "motion_detected"}
-        response = urequests.post(API_MOTION_ENDPOINT, json=data)
-        if response.status_code == 200: 
+        status = http.post(API_MOTION_PATH, MOTION_BODY)
+        if status == 200: 
             print("API POST Success: HTTP 200")
         else:
-            error_msg = f"API POST Failed: HTTP {response.status_code}"
+            error_msg = f"API POST Failed: HTTP {status}"
             print(error_msg)
             log_error_to_web(error_msg) # MODIFIED: Log this error
-        response.close()
     except Exception as e:
         error_msg = f"API POST Failed: {e}"
         print(error_msg)
@@ -181,16 +362,24 @@ def call_api_post():
 
 # --- Timer Callback Functions ---
 
+@micropython.native
+def motion_irq_callback(pin):
+    global motion_event
+    motion_event = True
+
+@micropython.viper
 def toggle_led_callback(t):
     # OLD version was: led.value(not led.value())
     
     # NEW "Spooky" version:
-    # Give it a 30% chance of being ON and 70% chance of being OFF.
+    # Give it a ~30% chance of being ON and ~70% chance of being OFF.
     # This creates an unstable, flickering effect.
-    if random.randint(1, 10) > 7:
-        led.value(1)  # 8, 9, 10 (30% chance)
+    # getrandbits(4) is a single 4-bit fetch (0-15), cheaper than randint's range math.
+    ld = led  # hoist the global lookup
+    if int(getrandbits(4)) < 5:  # 0-4 of 16 -> ~31% ON
+        ld.value(1)
     else:
-        led.value(0)  # 1, 2, 3, 4, 5, 6, 7 (70% chance)
+        ld.value(0)
 
 def stop_flashing_callback(t):
     # Note: Your variable is 21*1000, so this is a 21s timer :)
@@ -199,15 +388,19 @@ def stop_flashing_callback(t):
     led.value(0)      
 
 def set_state_idle_callback(t):
-    global current_state
+    global current_state, motion_event
+    # Only carry over motion that is still present when the cooldown ends
+    motion_event = pir.value() == 1
     print("10s cooldown finished. -> STATE_IDLE")
     current_state = STATE_IDLE
 
 
 # --- Main State Machine Logic ---
 # (No changes needed in the main loop logic, only in the functions it calls)
+# Compiled to native code; runs every loop tick.
+@micropython.native
 def state_machine_logic():
-    global current_state
+    global current_state, motion_event
 
     # --- STATE 0: INITIALIZATION ---
     if current_state == STATE_INIT:
@@ -228,19 +421,24 @@ def state_machine_logic():
         print("STATE_INIT: Setup complete!")
         blink_led(3, 100) 
         print("Transitioning to -> STATE_IDLE")
-        led.value(0) 
+        # Ignore edges latched during setup (Wi-Fi connect, PIR warm-up); only live motion counts
+        motion_event = pir.value() == 1
         current_state = STATE_IDLE
 
     # --- STATE 1: IDLE (Waiting for motion) ---
     elif current_state == STATE_IDLE:
-        if pir.value() == 1:
+        if motion_event:
+            motion_event = False
             print("Motion Detected! -> STATE_ACTIVE")
             
             call_api_post()
+            end_flicker()  # In case the setup blink is still running
             led_flash_timer.init(period=100, mode=Timer.PERIODIC, callback=toggle_led_callback)
             led_stop_timer.init(period=LED_FLASH_TIME_MS, mode=Timer.ONE_SHOT, callback=stop_flashing_callback)
             cooldown_timer.init(period=TOTAL_COOLDOWN_MS, mode=Timer.ONE_SHOT, callback=set_state_idle_callback)
             current_state = STATE_ACTIVE
+        else:
+            flush_errors()  # Nothing happening, send a queued error log
 
     # --- STATE 2: ACTIVE (Cooldown period) ---
     elif current_state == STATE_ACTIVE:
@@ -250,6 +448,9 @@ def state_machine_logic():
 # --- Main Application Start ---
 
 print("Starting State Machine...")
+# Motion is latched by a rising-edge interrupt instead of sampling pir.value()
+# each tick, so short PIR pulses between ticks are no longer missed.
+pir.irq(trigger=Pin.IRQ_RISING, handler=motion_irq_callback)
 while True:
     state_machine_logic()
     time.sleep_ms(50)
@@ -7,23 +7,47 @@ Loads Wi-Fi credentials from .env and connects using wifi_connector.
 import os
 from wifi_connector import connect_wifi
 
+# Parsed .env, reused until the file's mtime changes
+_ENV_CACHE = None
+_ENV_MTIME = None
+
+
+def invalidate_env():
+    """Force the next load_env() call to re-read .env."""
+    global _ENV_CACHE, _ENV_MTIME
+    _ENV_CACHE = None
+    _ENV_MTIME = None
+
+
 def load_env():
-    """Simple .env loader for MicroPython."""
+    """Simple .env loader for MicroPython (cached by file mtime)."""
+    global _ENV_CACHE, _ENV_MTIME
+    try:
+        mtime = os.stat(".env")[8]
+    except OSError:
+        mtime = None
+    if _ENV_CACHE is not None and mtime is not None and mtime == _ENV_MTIME:
+        return _ENV_CACHE
+
     print("LOAD START")
     creds = {}
     try:
         with open(".env") as f:
-            for line in f:
-                line = line.strip()
-                if not line or line.startswith("#"):
-                    continue
-                if "=" in line:
-                    key, value = line.split("=", 1)
-                    creds[key.strip()] = value.strip()
+            data = f.read()
+        for line in data.splitlines():
+            line = line.strip()
+            if not line or line[0] == "#":
+                continue
+            key, sep, value = line.partition("=")
+            if sep:
+                creds[key.strip()] = value.strip()
     except Exception as e:
         print(f"Could not read .env file: {e}")
 
     print("LOAD END")
+    if mtime is not None:
+        _ENV_CACHE = creds
+        _ENV_MTIME = mtime
     return creds
 
 
@@ -38,10 +62,10 @@ def connect_from_env(led_pin=None):
         print("Missing WIFI_SSID or WIFI_PASS in .env")
         return False, None, None
 
-    print(f"Connecting to Wi-Fi ({ssid}) from .env ...")
-    ok, wlan, ip = connect_wifi(ssid=ssid, password=password, led_pin=led_pin)
+    print("Connecting to Wi-Fi from .env:", ssid)
+    ok, wlan, ip = connect_wifi(ssid=ssid, password=password, led_pin=led_pin, blink_timer_id=3)
     if ok:
-        print(f"Connected to {ssid} at {ip}")
+        print("Connected to", ssid, "at", ip)
     else:
         print("Wi-Fi connection failed.")
 
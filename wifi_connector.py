@@ -3,22 +3,64 @@
 
 # type: ignore
 import time
-import network
 
 try:
-    from machine import Pin
+    import uasyncio
 except ImportError:
-    Pin = None  # allows importing on host without machine module
+    # CPython host: wrap asyncio with the *_ms helpers this module uses
+    import asyncio as _asyncio
+
+    class uasyncio:
+        run = staticmethod(_asyncio.run)
+        sleep = staticmethod(_asyncio.sleep)
+        create_task = staticmethod(_asyncio.create_task)
+        Event = _asyncio.Event
+        TimeoutError = _asyncio.TimeoutError
+
+        @staticmethod
+        def sleep_ms(ms):
+            return _asyncio.sleep(ms / 1000)
+
+        @staticmethod
+        def wait_for_ms(aw, timeout_ms):
+            return _asyncio.wait_for(aw, timeout_ms / 1000)
+
+# network and machine are imported lazily in WiFiManager so importing this
+# module stays cheap (and can be imported on a host without them)
+
+_POLL_MS = 250   # how often to check the link while waiting for an IP
+_BLINK_MS = 250  # LED toggle interval while waiting
+_BACKOFF_BLINK_MS = 150  # LED toggle interval during retry backoff
+_MAX_BACKOFF_S = 30      # cap for the exponential retry backoff
+
+# wlan.status() values that will not clear up by waiting or retrying (not every port defines all)
+_FATAL_STATUS_NAMES = ("STAT_WRONG_PASSWORD", "STAT_NO_AP_FOUND", "STAT_CONNECT_FAIL")
+
+# Shared station interface; every WiFiManager drives the same radio anyway
+_STA = None
+
+def _get_sta(network):
+    global _STA
+    if _STA is None:
+        _STA = network.WLAN(network.STA_IF)
+    return _STA
 
 # Optional: if you keep WIFI_SSID/WIFI_PASS in wifi_config.py
+_WIFI_CONFIG = None  # imported wifi_config module, False if unavailable, None if not tried yet
+
 def _load_creds(ssid, password):
+    global _WIFI_CONFIG
     if ssid and password:
         return ssid, password
-    try:
-        import wifi_config  # must provide WIFI_SSID, WIFI_PASS
-        return ssid or getattr(wifi_config, "WIFI_SSID"), password or getattr(wifi_config, "WIFI_PASS")
-    except Exception:
+    if _WIFI_CONFIG is None:
+        try:
+            import wifi_config  # must provide WIFI_SSID, WIFI_PASS
+            _WIFI_CONFIG = wifi_config
+        except Exception:
+            _WIFI_CONFIG = False
+    if not _WIFI_CONFIG:
         return ssid, password
+    return ssid or getattr(_WIFI_CONFIG, "WIFI_SSID", None), password or getattr(_WIFI_CONFIG, "WIFI_PASS", None)
 
 
 class WiFiManager:
@@ -27,10 +69,11 @@ class WiFiManager:
         from wifi_connector import WiFiManager
         wifi = WiFiManager(ssid="MyWiFi", password="mypassword", led_pin=5)
         ok = wifi.ensure()   # returns True/False
+        ok = await wifi.ensure_async()   # same, without blocking other uasyncio tasks
         wlan = wifi.wlan     # access the underlying WLAN object
         ip = wifi.ip()       # string or None
     """
-    def __init__(self, ssid=None, password=None, *, led_pin=None, timeout_s=15, retries=3, backoff_s=2, ifconfig=None, verbose=True):
+    def __init__(self, ssid=None, password=None, *, led_pin=None, timeout_s=15, retries=3, backoff_s=2, ifconfig=None, power_mode=None, blink_timer_id=None, verbose=True):
         """
         ssid/password: Wi-Fi credentials. If None, tries to import from wifi_config.py
         led_pin: optional GPIO to blink during connect (e.g., 5)
@@ -38,18 +81,38 @@ class WiFiManager:
         retries: number of attempts before giving up
         backoff_s: seconds to wait between attempts (exponential backoff applied)
         ifconfig: optional tuple (ip, mask, gw, dns) for static IP
+        power_mode: radio power mode set after each connect (default WLAN.PM_PERFORMANCE;
+                    pass WLAN.PM_NONE to disable power saving completely)
+        blink_timer_id: machine.Timer id used to blink led_pin; no blinking when None
+                        (default), so no timer is claimed behind the app's back. On ESP32
+                        only hardware timers 0-3 exist, pick one the app doesn't use
+                        (main.py takes all four). -1 is a virtual timer where supported
         """
+        import network
+        self._fatal_statuses = tuple(getattr(network, n) for n in _FATAL_STATUS_NAMES if hasattr(network, n))
+
         self.ssid, self.password = _load_creds(ssid, password)
-        self.wlan = network.WLAN(network.STA_IF)
+        self.wlan = _get_sta(network)
         self.timeout_s = max(1, int(timeout_s))
         self.retries = max(1, int(retries))
         self.backoff_s = max(0, int(backoff_s))
+        # Backoff before each retry, precomputed: doubles each time, capped at _MAX_BACKOFF_S
+        self._backoffs = []
+        d = self.backoff_s
+        for _ in range(self.retries - 1):
+            self._backoffs.append(d)
+            d = d * 2 if d * 2 < _MAX_BACKOFF_S else _MAX_BACKOFF_S
         self.ifconfig_cfg = ifconfig
+        self.power_mode = power_mode if power_mode is not None else getattr(network.WLAN, "PM_PERFORMANCE", None)
         self.verbose = verbose
+        self.last_status = None  # wlan.status() that ended the last wait, if it was fatal
 
+        self.blink_timer_id = blink_timer_id
+        self._blink_timer = None
         self.led = None
-        if led_pin is not None and Pin is not None:
+        if led_pin is not None:
             try:
+                from machine import Pin
                 self.led = Pin(led_pin, Pin.OUT)
                 self.led.value(0)
             except Exception:
@@ -59,11 +122,16 @@ class WiFiManager:
 
     def ensure(self):
         """Ensure Wi-Fi is connected. Returns True/False."""
-        if self.is_connected():
+        return uasyncio.run(self.ensure_async())
+
+    async def ensure_async(self):
+        """Coroutine version of ensure(); other tasks keep running while it waits."""
+        # One driver call on the common "already up" path (is_connected()/ip() would make four)
+        if self.wlan.isconnected():
             if self.verbose:
-                print("Wi-Fi already connected:", self.ip())
+                print("Wi-Fi already connected:", self.wlan.ifconfig()[0])
             return True
-        return self._connect_with_retries()
+        return await self._connect_with_retries_async()
 
     def disconnect(self):
         """Disconnect and deactivate Wi-Fi."""
@@ -89,14 +157,36 @@ class WiFiManager:
 
     # ---------- internals ----------
 
-    def _blink(self, on_ms=120, off_ms=120):
-        if not self.led:
-            time.sleep_ms(off_ms)
+    def _start_blink_timer(self, period_ms):
+        """Toggle the LED from a machine.Timer; returns the timer or None."""
+        if not self.led or self.blink_timer_id is None:
+            return None
+        led = self.led
+        try:
+            from machine import Timer
+            timer = Timer(self.blink_timer_id)
+            timer.init(period=period_ms, mode=Timer.PERIODIC, callback=lambda t: led.value(not led.value()))
+            return timer
+        except Exception as e:
+            if self.verbose:
+                print("Failed to start LED blink timer", self.blink_timer_id, ":", e)
+            return None
+
+    def _stop_blink_timer(self, timer):
+        if timer is not None:
+            timer.deinit()
+        if self.led:
+            self.led.value(0)
+
+    def _apply_power_mode(self):
+        # Default aggressive power saving makes some APs drop the link; re-applied on every connect
+        if self.power_mode is None:
             return
-        self.led.value(1)
-        time.sleep_ms(on_ms)
-        self.led.value(0)
-        time.sleep_ms(off_ms)
+        try:
+            self.wlan.config(pm=self.power_mode)
+        except Exception as e:
+            if self.verbose:
+                print("Failed to set Wi-Fi power mode:", e)
 
     def _prepare(self):
         self.wlan.active(True)
@@ -109,25 +199,53 @@ class WiFiManager:
             except Exception as e:
                 if self.verbose:
                     print("Failed to set static IP:", e)
+        # Blink from a hardware timer while connecting; stopped in _connect_once_async
+        self._blink_timer = self._start_blink_timer(_BLINK_MS)
 
-    def _wait_for_ip(self, timeout_s):
-        start = time.ticks_ms()
-        last_dot = 0
-        while not self.wlan.isconnected():
-            # Show progress and blink
-            if self.verbose:
-                now = time.ticks_ms()
-                if time.ticks_diff(now, last_dot) > 500:
-                    print(".", end="")
-                    last_dot = now
-            self._blink(80, 120)
-            if time.ticks_diff(time.ticks_ms(), start) > timeout_s * 1000:
-                return False
-        if self.verbose:
-            print()
-        return True
+    async def _watch_link_async(self):
+        """Background task: polls the driver and sets self._connected once the
+        link is up or has failed for good. Also counts the progress dots."""
+        # Bind hot lookups to locals once (LOAD_FAST instead of attribute lookups per poll)
+        ticks_ms = time.ticks_ms
+        ticks_diff = time.ticks_diff
+        isconn = self.wlan.isconnected
+        status_of = self.wlan.status
+        sleep_ms = uasyncio.sleep_ms
+        verbose = self.verbose
+
+        last_dot = ticks_ms()
+        while not isconn():
+            # Stop early on errors that waiting will not fix (bad password, no AP)
+            status = status_of()
+            if status in self._fatal_statuses:
+                self.last_status = status
+                break
+            now = ticks_ms()
+            # Count progress dots (printed in one go at the end)
+            if verbose and ticks_diff(now, last_dot) > 500:
+                self._dots += 1
+                last_dot = now
+            await sleep_ms(_POLL_MS)
+        self._connected.set()
+
+    async def _wait_for_ip_async(self, timeout_s):
+        # Sleep on an Event until the watcher reports a result, instead of
+        # polling here; wait_for_ms enforces the timeout.
+        self.last_status = None
+        self._dots = 0
+        self._connected = uasyncio.Event()
+        watcher = uasyncio.create_task(self._watch_link_async())
+        try:
+            await uasyncio.wait_for_ms(self._connected.wait(), timeout_s * 1000)
+        except uasyncio.TimeoutError:
+            pass
+        finally:
+            watcher.cancel()
+        if self.verbose and self._dots:
+            print("." * self._dots)
+        return self.last_status is None and self.wlan.isconnected()
 
-    def _connect_once(self):
+    async def _connect_once_async(self):
         if not self.ssid or not self.password:
             if self.verbose:
                 print("Wi-Fi credentials missing. Provide ssid/password or wifi_config.py")
@@ -136,55 +254,65 @@ class WiFiManager:
         if self.verbose:
             print('Connecting to Wi-Fi:', self.ssid)
         self._prepare()
-
         try:
-            # If already trying, disconnect first
-            if self.wlan.isconnected():
+            try:
+                # If already trying, disconnect first
+                if self.wlan.isconnected():
+                    return True
+                try:
+                    self.wlan.disconnect()
+                except Exception:
+                    pass
+                self.wlan.connect(self.ssid, self.password)
+            except Exception as e:
+                if self.verbose:
+                    print("Connect call failed:", e)
+                return False
+
+            ok = await self._wait_for_ip_async(self.timeout_s)
+            if ok:
+                self._apply_power_mode()
+                if self.verbose:
+                    print("Wi-Fi Connected:", self.wlan.ifconfig()[0])
                 return True
+
+            if self.verbose:
+                if self.last_status is not None:
+                    print("Wi-Fi connection failed, status:", self.last_status)
+                else:
+                    print("Wi-Fi connection timeout.")
             try:
                 self.wlan.disconnect()
             except Exception:
                 pass
-            self.wlan.connect(self.ssid, self.password)
-        except Exception as e:
-            if self.verbose:
-                print("Connect call failed:", e)
             return False
+        finally:
+            # Stop the connect blink; LED ends up off
+            self._stop_blink_timer(self._blink_timer)
+            self._blink_timer = None
 
-        ok = self._wait_for_ip(self.timeout_s)
-        if ok:
-            ip = self.ip()
-            if self.verbose:
-                print("Wi-Fi Connected:", ip)
-            if self.led:
-                # quick success blink
-                for _ in range(2):
-                    self._blink(50, 50)
-            return True
-
-        if self.verbose:
-            print("\nWi-Fi connection timeout.")
-        try:
-            self.wlan.disconnect()
-        except Exception:
-            pass
-        return False
-
-    def _connect_with_retries(self):
-        delay = self.backoff_s
+    async def _connect_with_retries_async(self):
         for attempt in range(1, self.retries + 1):
             if self.verbose:
                 print("Attempt", attempt, "of", self.retries)
-            if self._connect_once():
+            if await self._connect_once_async():
                 return True
-            if attempt < self.retries and delay > 0:
+            # Wrong password / unknown SSID won't fix themselves; retrying only
+            # hammers the router (some start throttling the device)
+            if self.last_status is not None:
+                if self.verbose:
+                    print("Not retrying: credentials or AP problem.")
+                return False
+            if attempt < self.retries and self._backoffs[attempt - 1] > 0:
+                delay = self._backoffs[attempt - 1]
                 if self.verbose:
                     print("Retrying in", delay, "s...")
-                # gentle blink during backoff
-                t_end = time.ticks_add(time.ticks_ms(), delay * 1000)
-                while time.ticks_diff(t_end, time.ticks_ms()) > 0:
-                    self._blink(30, 120)
-                delay = min(delay * 2, 30)  # cap backoff
+                # gentle blink during backoff, driven by a timer so the wait is one sleep
+                timer = self._start_blink_timer(_BACKOFF_BLINK_MS)
+                try:
+                    await uasyncio.sleep(delay)
+                finally:
+                    self._stop_blink_timer(timer)
         if self.verbose:
             print("Wi-Fi connection failed after retries.")
         return False
@@ -192,7 +320,7 @@ class WiFiManager:
 
 # -------- One-liner helper if you prefer functions over classes --------
 
-def connect_wifi(ssid=None, password=None, *, timeout_s=15, retries=3, backoff_s=2, led_pin=None, ifconfig=None, verbose=True):
+def connect_wifi(ssid=None, password=None, *, timeout_s=15, retries=3, backoff_s=2, led_pin=None, ifconfig=None, power_mode=None, blink_timer_id=None, verbose=True):
     """
     Functional wrapper. Returns (ok: bool, wlan: network.WLAN, ip: str|None)
     """
@@ -204,7 +332,29 @@ def connect_wifi(ssid=None, password=None, *, timeout_s=15, retries=3, backoff_s
         retries=retries,
         backoff_s=backoff_s,
         ifconfig=ifconfig,
+        power_mode=power_mode,
+        blink_timer_id=blink_timer_id,
         verbose=verbose,
     )
     ok = manager.ensure()
     return ok, manager.wlan, manager.ip()
+
+
+async def connect_wifi_async(ssid=None, password=None, *, timeout_s=15, retries=3, backoff_s=2, led_pin=None, ifconfig=None, power_mode=None, blink_timer_id=None, verbose=True):
+    """
+    Coroutine version of connect_wifi(). Returns (ok: bool, wlan: network.WLAN, ip: str|None)
+    """
+    manager = WiFiManager(
+        ssid=ssid,
+        password=password,
+        led_pin=led_pin,
+        timeout_s=timeout_s,
+        retries=retries,
+        backoff_s=backoff_s,
+        ifconfig=ifconfig,
+        power_mode=power_mode,
+        blink_timer_id=blink_timer_id,
+        verbose=verbose,
+    )
+    ok = await manager.ensure_async()
+    return ok, manager.wlan, manager.ip()